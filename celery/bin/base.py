@@ -169,6 +169,12 @@ class CeleryDaemonCommand(CeleryCommand):
         self.params.append(CeleryOption(('--umask',), help_group="Daemonization Options"))
         self.params.append(CeleryOption(('--executable',), help_group="Daemonization Options"))
 
+    def parse_args(self, ctx, args):
+        # The celery group records the full command-line, this is only
+        # used when the command is invoked on its own.
+        ctx.meta.setdefault('celery.argv', [ctx.info_name] + list(args))
+        return super().parse_args(ctx, args)
+
 
 class CommaSeparatedList(ParamType):
     """Comma separated list argument."""
@@ -42,7 +42,17 @@ class App(ParamType):
 APP = App()
 
 
-@click.group(cls=DYMGroup, invoke_without_command=True)
+class CeleryGroup(DYMGroup):
+    """Celery command group."""
+
+    def parse_args(self, ctx, args):
+        # Keep the original command-line, daemon commands need it
+        # to re-execute themselves when started with --detach.
+        ctx.meta['celery.argv'] = list(args)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=CeleryGroup, invoke_without_command=True)
 @click.option('-A',
               '--app',
               envvar='APP',
@@ -1,6 +1,7 @@
 """Program used to start a Celery worker instance."""
 
 import os
+import re
 import sys
 
 import click
@@ -16,32 +17,49 @@ from celery.utils.nodenames import default_nodename, host_format, node_format
 
 logger = get_logger(__name__)
 
+#: Default value for the ``--hostname`` option.
+_DEFAULT_HOSTNAME = host_format(default_nodename(None))
+
+_POOL_CHOICES = ('prefork', 'eventlet', 'gevent', 'solo')
+
+#: Flags removed from the detached worker's command-line.
+_DETACH_FLAGS = frozenset({'-D', '--detach'})
+
+#: Options (and their values) applied by :func:`detach` itself,
+#: and so removed from the detached worker's command-line.
+_DETACH_OPTIONS = frozenset({
+    '--uid', '--gid', '--umask', '--executable', '--workdir',
+})
+
+_AUTOSCALE_RE = re.compile(r'\s*(\d+)\s*(?:,\s*(\d+)\s*)?\Z')
+
 
 def maybe_patch_concurrency(library):
     """Patches gevent/eventlet libraries."""
-
-    def patch_eventlet():
+    if library == 'eventlet':
         import eventlet.debug
 
-        eventlet.monkey_patch()
+        if not eventlet.patcher.is_monkey_patched('os'):
+            eventlet.monkey_patch()
         blockdetect = float(os.environ.get('EVENTLET_NOBLOCK', 0))
         if blockdetect:
             eventlet.debug.hub_blocking_detection(blockdetect, blockdetect)
-
-    def patch_gevent():
+    elif library == 'gevent':
         import gevent.monkey
         import gevent.signal
 
-        gevent.monkey.patch_all()
+        if not gevent.monkey.is_module_patched('os'):
+            gevent.monkey.patch_all()
 
-    patches = {
-        'eventlet': patch_eventlet,
-        'gevent': patch_gevent
-    }
 
-    patcher = patches.get(library)
-    if patcher:
-        patcher()
+def _is_monkey_patched():
+    """Return true if gevent or eventlet already patched the os module."""
+    gevent_monkey = sys.modules.get('gevent.monkey')
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('os'):
+        return True
+    eventlet_patcher = sys.modules.get('eventlet.patcher')
+    return bool(eventlet_patcher is not None and
+                eventlet_patcher.is_monkey_patched('os'))
 
 
 class CeleryBeat(ParamType):
@@ -64,15 +82,28 @@ class WorkersPool(click.Choice):
 
     def __init__(self):
         """Initialize the workers pool option with the relevant choices."""
-        super().__init__(('prefork', 'eventlet', 'gevent', 'solo'))
+        super().__init__(_POOL_CHOICES)
 
     def convert(self, value, param, ctx):
+        # Aliases are case-insensitive, anything else is passed on
+        # as a class path (e.g. ``mypkg.pools:MyPool``).
+        if isinstance(value, str) and value.lower() in concurrency.ALIASES:
+            value = value.lower()
+
+        if value == 'prefork' and _is_monkey_patched():
+            logger.warning(
+                'gevent/eventlet monkey patching detected with -P prefork; '
+                'the worker may hang.  Use -P gevent or -P eventlet instead.')
+
         # Pools like eventlet/gevent needs to patch libs as early
         # as possible.
         maybe_patch_concurrency(value)
 
-        return concurrency.get_implementation(
-            value) or ctx.obj.app.conf.worker_pool
+        try:
+            return concurrency.get_implementation(
+                value) or ctx.obj.app.conf.worker_pool
+        except (ImportError, AttributeError, ValueError) as exc:
+            self.fail(f'Unknown pool implementation {value!r}: {exc}')
 
 
 class Hostname(StringParamType):
@@ -90,23 +121,25 @@ class Autoscale(ParamType):
     name = "<min workers>, <max workers>"
 
     def convert(self, value, param, ctx):
-        value = value.split(',')
+        if value.isdecimal():
+            return int(value), 0
 
-        if len(value) > 2:
-            self.fail("Expected two comma separated integers or one integer."
-                      f"Got {len(value)} instead.")
+        m = _AUTOSCALE_RE.match(value)
+        if m is None:
+            self.fail("Expected two comma separated integers or one integer. "
+                      f"Got {value} instead.")
 
-        if len(value) == 1:
-            try:
-                value = (int(value[0]), 0)
-            except ValueError:
-                self.fail(f"Expected an integer. Got {value} instead.")
+        a, b = int(m.group(1)), int(m.group(2) or 0)
+        return (a, b) if a >= b else (b, a)
 
-        try:
-            return tuple(reversed(sorted(map(int, value))))
-        except ValueError:
-            self.fail("Expected two comma separated integers."
-                      f"Got {value.join(',')} instead.")
+
+def _conf_default(key):
+    """Return an option callback falling back to ``app.conf[key]``."""
+    def callback(ctx, _, value):
+        if value is not None:
+            return value
+        return getattr(ctx.obj.app.conf, key)
+    return callback
 
 
 CELERY_BEAT = CeleryBeat()
@@ -114,14 +147,61 @@ WORKERS_POOL = WorkersPool()
 HOSTNAME = Hostname()
 AUTOSCALE = Autoscale()
 
-C_FAKEFORK = os.environ.get('C_FAKEFORK')
+
+def _maybe_node_format(value, hostname):
+    """Like :func:`node_format`, but skip values with no ``%`` template."""
+    if value is None or '%' not in value:
+        return value
+    return node_format(value, hostname)
+
+
+def _without_detach_flag(arg, short_flags):
+    """Remove ``D`` from a group of short flags such as ``-DE``."""
+    chars = []
+    for i, char in enumerate(arg[1:], 1):
+        if char not in short_flags:
+            # An option taking a value: the rest of the group is the value.
+            chars.append(arg[i:])
+            break
+        if char != 'D':
+            chars.append(char)
+    return '-' + ''.join(chars) if chars else None
+
+
+def _detached_argv(args, command):
+    """Return the command-line for the detached worker from ``args``."""
+    short_flags = {
+        opt[1] for param in command.params
+        if isinstance(param, click.Option) and param.is_flag
+        for opt in param.opts if len(opt) == 2 and opt[1] != '-'
+    }
+    argv = ['-m', 'celery']
+    args = iter(args)
+    for arg in args:
+        if arg == '--':
+            argv.append(arg)
+            argv.extend(args)
+            break
+        if len(arg) > 2 and arg[0] == '-' and arg[1] != '-':
+            arg = _without_detach_flag(arg, short_flags)
+            if arg is None:
+                continue
+        opt, sep, _ = arg.partition('=')
+        if opt in _DETACH_FLAGS:
+            continue
+        if opt in _DETACH_OPTIONS:
+            if not sep:
+                next(args, None)
+            continue
+        argv.append(arg)
+    return argv
 
 
 def detach(path, argv, logfile=None, pidfile=None, uid=None,
            gid=None, umask=None, workdir=None, fake=False, app=None,
            executable=None, hostname=None):
     """Detach program by argv."""
-    fake = 1 if C_FAKEFORK else fake
+    fake = 1 if os.environ.get('C_FAKEFORK') else fake
     with detached(logfile, pidfile, uid, gid, umask, workdir, fake,
                   after_forkers=False):
         try:
@@ -146,7 +226,7 @@ def detach(path, argv, logfile=None, pidfile=None, uid=None,
                })
 @click.option('-n',
               '--hostname',
-              default=host_format(default_nodename(None)),
+              default=_DEFAULT_HOSTNAME,
               cls=CeleryOption,
               type=HOSTNAME,
               help_group="Worker Options",
@@ -163,7 +243,7 @@ def detach(path, argv, logfile=None, pidfile=None, uid=None,
               '--statedb',
               cls=CeleryOption,
               type=click.Path(),
-              callback=lambda ctx, _, value: value or ctx.obj.app.conf.worker_state_db,
+              callback=_conf_default('worker_state_db'),
               help_group="Worker Options",
               help="Path to the state database. The extension '.db' may be"
                    "appended to the filename.")
@@ -184,7 +264,7 @@ def detach(path, argv, logfile=None, pidfile=None, uid=None,
 @click.option('--prefetch-multiplier',
               type=int,
               metavar="<prefetch multiplier>",
-              callback=lambda ctx, _, value: value or ctx.obj.app.conf.worker_prefetch_multiplier,
+              callback=_conf_default('worker_prefetch_multiplier'),
               cls=CeleryOption,
               help_group="Worker Options",
               help="Set custom prefetch multiplier value"
@@ -193,7 +273,7 @@ def detach(path, argv, logfile=None, pidfile=None, uid=None,
               '--concurrency',
               type=int,
               metavar="<concurrency>",
-              callback=lambda ctx, _, value: value or ctx.obj.app.conf.worker_concurrency,
+              callback=_conf_default('worker_concurrency'),
               cls=CeleryOption,
               help_group="Pool Options",
               help="Number of child processes processing the queue.  "
@@ -292,7 +372,7 @@ def detach(path, argv, logfile=None, pidfile=None, uid=None,
 @click.option('-s',
               '--schedule-filename',
               '--schedule',
-              callback=lambda ctx, _, value: value or ctx.obj.app.conf.beat_schedule_filename,
+              callback=_conf_default('beat_schedule_filename'),
               cls=CeleryOption,
               help_group="Embedded Beat Options")
 @click.option('--scheduler',
@@ -326,11 +406,18 @@ def worker(ctx, hostname=None, pool_cls=None, uid=None, gid=None,
             user_options[param.name] = val
             return val
 
-        for x in user_opts:
-            x.callback = cb
+        # The options are shared by the app, so restore their original
+        # callbacks once the extra arguments are parsed.
+        callbacks = {x: x.callback for x in user_opts}
+        try:
+            for x in user_opts:
+                x.callback = cb
 
-        cmd = click.Command("user", params=list(user_opts))
-        cmd.parse_args(ctx, list(user_extra_params))
+            cmd = click.Command("user", params=list(user_opts))
+            cmd.parse_args(ctx, list(user_extra_params))
+        finally:
+            for x, callback in callbacks.items():
+                x.callback = callback
 
         kwargs.update(user_options)
 
@@ -343,41 +430,28 @@ def worker(ctx, hostname=None, pool_cls=None, uid=None, gid=None,
                 "Unable to parse extra configuration from command line.\n"
                 f"Reason: {e}", ctx=ctx)
     if kwargs.get('detach', False):
-        params = ctx.params.copy()
-        params.pop('detach')
-        params.pop('logfile')
-        params.pop('pidfile')
-        params.pop('uid')
-        params.pop('gid')
-        umask = params.pop('umask')
+        # Use the original command-line, as the values in ctx.params
+        # have already been converted by their parameter types.
+        argv = _detached_argv(ctx.meta['celery.argv'], ctx.command)
+        umask = ctx.params.get('umask')
         workdir = ctx.obj.workdir
-        params.pop('hostname')
-        executable = params.pop('executable')
-        argv = ['-m', 'celery', 'worker']
-        for arg, value in params.items():
-            if isinstance(value, bool) and value:
-                argv.append(f'--{arg}')
-            else:
-                if value is not None:
-                    argv.append(f'--{arg}')
-                    argv.append(str(value))
-            return detach(sys.executable,
-                          argv,
-                          logfile=logfile,
-                          pidfile=pidfile,
-                          uid=uid, gid=gid,
-                          umask=umask,
-                          workdir=workdir,
-                          app=app,
-                          executable=executable,
-                          hostname=hostname)
-        return
+        executable = ctx.params.get('executable')
+        return detach(sys.executable,
+                      argv,
+                      logfile=logfile,
+                      pidfile=pidfile,
+                      uid=uid, gid=gid,
+                      umask=umask,
+                      workdir=workdir,
+                      app=app,
+                      executable=executable,
+                      hostname=hostname)
     maybe_drop_privileges(uid=uid, gid=gid)
     worker = app.Worker(
         hostname=hostname, pool_cls=pool_cls, loglevel=loglevel,
         logfile=logfile,  # node format handled by celery.app.log.setup
-        pidfile=node_format(pidfile, hostname),
-        statedb=node_format(statedb, hostname),
+        pidfile=_maybe_node_format(pidfile, hostname),
+        statedb=_maybe_node_format(statedb, hostname),
         no_color=ctx.obj.no_color,
         **kwargs)
     worker.start()
@@ -0,0 +1,290 @@
+import re
+import sys
+from unittest.mock import Mock, patch
+
+import click
+import pytest
+from click import BadParameter
+from click.testing import CliRunner
+
+from celery.bin.base import CLIContext
+from celery.bin.celery import celery
+from celery.bin.worker import (AUTOSCALE, WORKERS_POOL, _detached_argv,
+                               worker)
+from celery.concurrency.prefork import TaskPool as PreforkPool
+from celery.concurrency.solo import TaskPool as SoloPool
+from celery.concurrency.thread import TaskPool as ThreadPool
+from celery.utils.nodenames import host_format
+from t.unit.bin.proj.app import app as proj_app
+
+
+class CustomPool(SoloPool):
+    pass
+
+
+class test_Autoscale:
+
+    @pytest.mark.parametrize('value,expected', [
+        ('3,10', (10, 3)),
+        ('10,3', (10, 3)),
+        (' 10 , 3 ', (10, 3)),
+        ('5,5', (5, 5)),
+    ])
+    def test_convert(self, value, expected):
+        assert AUTOSCALE.convert(value, None, None) == expected
+
+    @pytest.mark.parametrize('value,expected', [
+        ('10', (10, 0)),
+        ('0', (0, 0)),
+        (' 10 ', (10, 0)),
+    ])
+    def test_convert_single(self, value, expected):
+        assert AUTOSCALE.convert(value, None, None) == expected
+
+    @pytest.mark.parametrize('value', [
+        '1,2,3', 'a', '1,', '', '-1', '+1', '1_0',
+    ])
+    def test_invalid(self, value):
+        with pytest.raises(BadParameter, match=re.escape(
+                'Expected two comma separated integers or one integer. '
+                f'Got {value} instead.')):
+            AUTOSCALE.convert(value, None, None)
+
+
+class test_WorkersPool:
+
+    def test_alias(self):
+        assert WORKERS_POOL.convert('prefork', None, Mock()) is PreforkPool
+
+    def test_alias_is_case_insensitive(self):
+        assert WORKERS_POOL.convert('Solo', None, Mock()) is SoloPool
+
+    def test_alias_outside_of_choices(self):
+        assert WORKERS_POOL.convert('threads', None, Mock()) is ThreadPool
+        assert WORKERS_POOL.convert('processes', None, Mock()) is PreforkPool
+
+    def test_class_path(self):
+        assert WORKERS_POOL.convert(
+            't.unit.bin.test_worker:CustomPool', None, Mock()) is CustomPool
+
+    def test_class(self):
+        assert WORKERS_POOL.convert(CustomPool, None, Mock()) is CustomPool
+
+    @pytest.mark.parametrize('value', ['notapool', ''])
+    def test_invalid(self, value):
+        with pytest.raises(BadParameter, match='Unknown pool implementation'):
+            WORKERS_POOL.convert(value, None, Mock())
+
+
+class test_WorkersPool_monkey_patched:
+
+    @pytest.fixture(params=['gevent', 'eventlet'])
+    def patched(self, request):
+        if request.param == 'gevent':
+            modules = {'gevent.monkey': Mock(name='gevent.monkey')}
+            modules['gevent.monkey'].is_module_patched.return_value = True
+        else:
+            modules = {'eventlet.patcher': Mock(name='eventlet.patcher')}
+            modules['eventlet.patcher'].is_monkey_patched.return_value = True
+        with patch.dict(sys.modules, modules), \
+                patch('celery.bin.worker.maybe_patch_concurrency'), \
+                patch('celery.concurrency.get_implementation'), \
+                patch('celery.bin.worker.logger') as logger:
+            yield logger
+
+    def test_warns_for_prefork(self, patched):
+        WORKERS_POOL.convert('prefork', None, Mock())
+        patched.warning.assert_called_once()
+
+    @pytest.mark.parametrize('pool', ['gevent', 'eventlet', 'solo'])
+    def test_no_warning_for_other_pools(self, patched, pool):
+        WORKERS_POOL.convert(pool, None, Mock())
+        patched.warning.assert_not_called()
+
+    def test_no_warning_when_not_patched(self):
+        with patch.dict(sys.modules, {'gevent.monkey': None,
+                                      'eventlet.patcher': None}), \
+                patch('celery.bin.worker.logger') as logger:
+            WORKERS_POOL.convert('prefork', None, Mock())
+        logger.warning.assert_not_called()
+
+
+class test_worker_conf_defaults:
+
+    def invoke(self, *args):
+        with patch.object(proj_app, 'Worker') as Worker:
+            res = CliRunner().invoke(
+                celery, ['-A', 't.unit.bin.proj.app', 'worker'] + list(args),
+                catch_exceptions=False)
+        assert res.exit_code == 0
+        return Worker.call_args[1]
+
+    def test_explicit_zero_is_kept(self):
+        with patch.dict(proj_app.conf, worker_concurrency=8,
+                        worker_prefetch_multiplier=8):
+            kwargs = self.invoke('-c', '0', '--prefetch-multiplier', '0')
+        assert kwargs['concurrency'] == 0
+        assert kwargs['prefetch_multiplier'] == 0
+
+    def test_omitted_falls_back_to_conf(self):
+        with patch.dict(proj_app.conf, worker_concurrency=8,
+                        worker_prefetch_multiplier=3):
+            kwargs = self.invoke()
+        assert kwargs['concurrency'] == 8
+        assert kwargs['prefetch_multiplier'] == 3
+
+
+class test_worker_detach:
+
+    def test_argv_round_trip(self):
+        args = [
+            '-A', 't.unit.bin.proj.app', '--workdir', '.',
+            'worker', '-D', '--uid', '1000', '--gid=1000', '--umask', '0',
+            '--executable', '/usr/bin/python3',
+            '-n', 'w1@%h', '-l', 'INFO', '-P', 'solo', '-Q', 'a,b',
+            '--autoscale', '10,3', '--without-gossip', 'true',
+            '--max-tasks-per-child', '5', '-c', '0',
+            '-f', '/var/log/w1.log', '--pidfile', '/var/run/w1.pid',
+        ]
+        runner = CliRunner()
+        with patch('celery.bin.worker.detach') as detach:
+            res = runner.invoke(celery, args, catch_exceptions=False)
+        assert res.exit_code == 0
+        detach.assert_called_once()
+        argv = detach.call_args[0][1]
+        assert argv[:2] == ['-m', 'celery']
+        for arg in ('-D', '--uid', '--gid=1000', '--umask',
+                    '--executable', '--workdir'):
+            assert arg not in argv
+        i = argv.index('--without-gossip')
+        assert argv[i + 1] == 'true'
+        assert detach.call_args[1]['logfile'] == '/var/log/w1.log'
+
+        # The detached worker must accept the command-line it is given.
+        with patch.object(proj_app, 'Worker') as Worker, \
+                patch('celery.bin.worker.detach') as detach:
+            res = runner.invoke(celery, argv[2:], catch_exceptions=False)
+        assert res.exit_code == 0
+        detach.assert_not_called()
+        kwargs = Worker.call_args[1]
+        assert kwargs['hostname'] == host_format('w1@%h')
+        assert kwargs['loglevel'] == 20
+        assert kwargs['pool'] is SoloPool
+        assert kwargs['queues'] == {'a', 'b'}
+        assert kwargs['autoscale'] == (10, 3)
+        assert kwargs['max_tasks_per_child'] == 5
+        assert kwargs['concurrency'] == 0
+        assert kwargs['logfile'] == '/var/log/w1.log'
+        assert kwargs['pidfile'] == '/var/run/w1.pid'
+
+    def test_all_options_passed_on(self):
+        args = ['-A', 't.unit.bin.proj.app', 'worker', '--detach',
+                '-P', 'solo', '-E', '--time-limit', '30', '-O', 'fair']
+        with patch('celery.bin.worker.detach') as detach:
+            res = CliRunner().invoke(celery, args, catch_exceptions=False)
+        assert res.exit_code == 0
+        detach.assert_called_once()
+        assert detach.call_args[0][1] == [
+            '-m', 'celery', '-A', 't.unit.bin.proj.app', 'worker',
+            '-P', 'solo', '-E', '--time-limit', '30', '-O', 'fair',
+        ]
+
+    def test_ignores_process_argv(self):
+        args = ['-A', 't.unit.bin.proj.app', 'worker', '-D', '-P', 'solo']
+        with patch('sys.argv', ['myscript.py', '--foo']), \
+                patch('celery.bin.worker.detach') as detach:
+            res = CliRunner().invoke(celery, args, catch_exceptions=False)
+        assert res.exit_code == 0
+        assert detach.call_args[0][1] == [
+            '-m', 'celery', '-A', 't.unit.bin.proj.app', 'worker',
+            '-P', 'solo',
+        ]
+
+    def test_command_invoked_directly(self):
+        obj = CLIContext(app=lambda: proj_app, no_color=True, workdir=None)
+        with patch('celery.bin.worker.detach') as detach:
+            res = CliRunner().invoke(
+                worker, ['-D', '-P', 'solo'], obj=obj,
+                catch_exceptions=False)
+        assert res.exit_code == 0
+        assert detach.call_args[0][1] == [
+            '-m', 'celery', 'worker', '-P', 'solo',
+        ]
+
+    @pytest.mark.parametrize('flags,expected', [
+        ('-DE', '-E'), ('-BD', '-B'), ('-EDB', '-EB'),
+    ])
+    def test_grouped_detach_flag(self, flags, expected):
+        args = ['-A', 't.unit.bin.proj.app', 'worker', flags, '-P', 'solo']
+        runner = CliRunner()
+        with patch('celery.bin.worker.detach') as detach:
+            res = runner.invoke(celery, args, catch_exceptions=False)
+        assert res.exit_code == 0
+        argv = detach.call_args[0][1]
+        assert argv == [
+            '-m', 'celery', '-A', 't.unit.bin.proj.app', 'worker',
+            expected, '-P', 'solo',
+        ]
+
+        # The detached worker must not detach again.
+        with patch.object(proj_app, 'Worker') as Worker, \
+                patch('celery.bin.worker.detach') as detach:
+            res = runner.invoke(celery, argv[2:], catch_exceptions=False)
+        assert res.exit_code == 0
+        detach.assert_not_called()
+        Worker.assert_called_once()
+
+    def test_grouped_short_option_value(self):
+        assert _detached_argv(['worker', '-QD', '-EQD'], worker) == [
+            '-m', 'celery', 'worker', '-QD', '-EQD',
+        ]
+
+    def test_detached_argv(self):
+        assert _detached_argv([
+            'worker', '-D', '--uid=1000', '--gid', '1000', '-c', '2',
+            '--', '--uid', '1',
+        ], worker) == ['-m', 'celery', 'worker', '-c', '2', '--', '--uid', '1']
+
+
+class test_worker_user_options:
+
+    @pytest.fixture
+    def user_option(self):
+        added = []
+
+        def add(*args, **kwargs):
+            option = click.Option(*args, **kwargs)
+            proj_app.user_options['worker'].add(option)
+            added.append(option)
+            return option
+        yield add
+        for option in added:
+            proj_app.user_options['worker'].discard(option)
+
+    def invoke(self, *args, **kwargs):
+        with patch.object(proj_app, 'Worker') as Worker:
+            res = CliRunner().invoke(
+                celery, ['-A', 't.unit.bin.proj.app', 'worker'] + list(args),
+                **kwargs)
+        return res, Worker
+
+    def test_envvar(self, user_option):
+        option = user_option(['--foo'], envvar='WORKER_FOO', type=int)
+        callback = option.callback
+        res, Worker = self.invoke(env={'WORKER_FOO': '3'})
+        assert res.exit_code == 0
+        assert Worker.call_args[1]['foo'] == 3
+        assert option.callback is callback
+
+    def test_command_line(self, user_option):
+        user_option(['--foo'], envvar='WORKER_FOO')
+        res, Worker = self.invoke('--foo', 'bar', env={'WORKER_FOO': '3'})
+        assert res.exit_code == 0
+        assert Worker.call_args[1]['foo'] == 'bar'
+
+    def test_required(self, user_option):
+        user_option(['--foo'], required=True)
+        res, Worker = self.invoke()
+        assert res.exit_code == 2
+        assert "Missing option '--foo'" in res.output
+        Worker.assert_not_called()
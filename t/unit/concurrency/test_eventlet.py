@@ -35,16 +35,30 @@ class EventletCase:
 
 class test_aaa_eventlet_patch(EventletCase):
 
-    def test_aaa_is_patched(self):
+    @patch('eventlet.patcher.is_monkey_patched', create=True,
+           return_value=False)
+    def test_aaa_is_patched(self, is_monkey_patched):
         with patch('eventlet.monkey_patch', create=True) as monkey_patch:
             from celery.bin.worker import maybe_patch_concurrency
             maybe_patch_concurrency('eventlet')
             monkey_patch.assert_called_with()
 
+    @patch('eventlet.patcher.is_monkey_patched', create=True,
+           return_value=True)
+    def test_aaa_already_patched(self, is_monkey_patched):
+        with patch('eventlet.monkey_patch', create=True) as monkey_patch:
+            from celery.bin.worker import maybe_patch_concurrency
+            maybe_patch_concurrency('eventlet')
+            is_monkey_patched.assert_called_with('os')
+            monkey_patch.assert_not_called()
+
+    @patch('eventlet.patcher.is_monkey_patched', create=True,
+           return_value=False)
     @patch('eventlet.debug.hub_blocking_detection', create=True)
     @patch('eventlet.monkey_patch', create=True)
     def test_aaa_blockdetecet(
-            self, monkey_patch, hub_blocking_detection, patching):
+            self, monkey_patch, hub_blocking_detection, is_monkey_patched,
+            patching):
         patching.setenv('EVENTLET_NOBLOCK', '10.3')
         from celery.bin.worker import maybe_patch_concurrency
         maybe_patch_concurrency('eventlet')
@@ -17,12 +17,24 @@ class test_gevent_patch:
     def test_is_patched(self):
         self.patching.modules(*gevent_modules)
         patch_all = self.patching('gevent.monkey.patch_all')
+        is_module_patched = self.patching('gevent.monkey.is_module_patched')
+        is_module_patched.return_value = False
         import gevent
         gevent.version_info = (1, 0, 0)
         from celery.bin.worker import maybe_patch_concurrency
         maybe_patch_concurrency('gevent')
         patch_all.assert_called()
 
+    def test_already_patched(self):
+        self.patching.modules(*gevent_modules)
+        patch_all = self.patching('gevent.monkey.patch_all')
+        is_module_patched = self.patching('gevent.monkey.is_module_patched')
+        is_module_patched.return_value = True
+        from celery.bin.worker import maybe_patch_concurrency
+        maybe_patch_concurrency('gevent')
+        is_module_patched.assert_called_with('os')
+        patch_all.assert_not_called()
+
 
 class test_Timer:
 